@@ -0,0 +1,368 @@
+"""Append-only meeting event log and incremental per-meeting aggregates.
+
+WebSocket dispatch calls `event_log.record(...)`, which only appends to an
+in-memory buffer. A background task writes the buffer as one block per flush
+into rolling segment files under ANALYTICS_DIR. Each block stores its events
+column by column (timestamps delta-encoded, meeting ids dictionary-encoded,
+zlib-compressed), so segments can be bulk-loaded into a columnar store later.
+
+`analytics_index` tails the segments from a background task, remembering the
+byte offset reached in each file, and folds only new blocks into running
+per-meeting totals; queries read those totals and never touch the OLTP tables.
+Segments are deleted after SEGMENT_RETENTION_SECONDS and finished meetings
+leave the in-memory index after MEETING_RETENTION_SECONDS.
+"""
+import asyncio
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from .sharding import WORKER_ID
+
+
+ANALYTICS_DIR = os.environ.get("BAAPMEET_ANALYTICS_DIR", "analytics")
+FLUSH_SECONDS = 1.0
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024
+SEGMENT_MAX_SECONDS = 3600
+SEGMENT_RETENTION_SECONDS = 7 * 24 * 3600
+MEETING_RETENTION_SECONDS = 24 * 3600
+INDEX_REFRESH_SECONDS = 5.0
+# Events held in memory across failed writes before the oldest are dropped
+MAX_BUFFERED_EVENTS = 200_000
+
+BLOCK_MAGIC = b"BMEV"
+BLOCK_VERSION = 1
+BLOCK_HEADER = struct.Struct("<4sBI")
+
+EVENT_CODES = {
+    "join": 0,
+    "leave": 1,
+    "mute": 2,
+    "unmute": 3,
+    "camera-on": 4,
+    "camera-off": 5,
+    "screen-share-start": 6,
+    "screen-share-stop": 7,
+    "chat": 8,
+}
+EVENT_NAMES = {code: name for name, code in EVENT_CODES.items()}
+
+# (timestamp ms, meeting_id, user_id, event code, value)
+Event = Tuple[int, str, int, int, int]
+
+
+def encode_block(events: List[Event]) -> bytes:
+    meetings: Dict[str, int] = {}
+    t0 = events[0][0]
+    columns = {
+        "t0": t0,
+        "ts": [],
+        "meetings": [],
+        "m": [],
+        "u": [],
+        "e": [],
+        "v": [],
+    }
+    prev = t0
+    for ts, meeting_id, user_id, code, value in events:
+        columns["ts"].append(ts - prev)
+        prev = ts
+        idx = meetings.get(meeting_id)
+        if idx is None:
+            idx = meetings[meeting_id] = len(columns["meetings"])
+            columns["meetings"].append(meeting_id)
+        columns["m"].append(idx)
+        columns["u"].append(user_id)
+        columns["e"].append(code)
+        columns["v"].append(value)
+    payload = zlib.compress(json.dumps(columns, separators=(",", ":")).encode("utf-8"))
+    return BLOCK_HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, len(payload)) + payload
+
+
+def decode_block(payload: bytes) -> List[Event]:
+    columns = json.loads(zlib.decompress(payload))
+    events: List[Event] = []
+    ts = columns["t0"]
+    names = columns["meetings"]
+    for delta, m, u, e, v in zip(columns["ts"], columns["m"], columns["u"], columns["e"], columns["v"]):
+        ts += delta
+        events.append((ts, names[m], u, e, v))
+    return events
+
+
+def read_blocks(path: str, offset: int) -> Tuple[List[Event], int]:
+    """Decode complete blocks after `offset`; returns events and the new offset.
+
+    A block still being written (short read) is left for the next call; a
+    damaged block raises ValueError.
+    """
+    events: List[Event] = []
+    with open(path, "rb") as fh:
+        fh.seek(offset)
+        while True:
+            header = fh.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                break
+            magic, version, length = BLOCK_HEADER.unpack(header)
+            if magic != BLOCK_MAGIC or version != BLOCK_VERSION:
+                raise ValueError(f"Corrupt analytics segment {path} at byte {offset}")
+            payload = fh.read(length)
+            if len(payload) < length:
+                break
+            try:
+                events.extend(decode_block(payload))
+            except (zlib.error, json.JSONDecodeError, KeyError, TypeError, IndexError) as exc:
+                raise ValueError(f"Corrupt analytics segment {path} at byte {offset}") from exc
+            offset += BLOCK_HEADER.size + length
+    return events, offset
+
+
+class EventLog:
+    def __init__(self, directory: str = ANALYTICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._buffer: List[Event] = []
+        self._segment: Optional[str] = None
+        self._segment_started = 0.0
+        self._segment_bytes = 0
+
+    def record(self, meeting_id: str, user_id: int, event: str, value: int = 0):
+        code = EVENT_CODES.get(event)
+        if code is None:
+            return
+        with self._lock:
+            self._buffer.append((int(time.time() * 1000), meeting_id, user_id, code, value))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return
+            block = encode_block(events)
+            try:
+                path = self._segment_for(len(block))
+                with open(path, "ab") as fh:
+                    fh.write(block)
+            except OSError:
+                # Put the batch back in front of anything recorded meanwhile,
+                # capped so a long outage cannot exhaust memory
+                with self._lock:
+                    self._buffer = (events + self._buffer)[-MAX_BUFFERED_EVENTS:]
+                # a partial write may have left a torn block; start a new segment
+                self._segment = None
+                raise
+            self._segment_bytes += len(block)
+
+    def _segment_for(self, size: int) -> str:
+        now = time.time()
+        if (
+            self._segment is None
+            or self._segment_bytes + size > SEGMENT_MAX_BYTES
+            or now - self._segment_started > SEGMENT_MAX_SECONDS
+        ):
+            os.makedirs(self.directory, exist_ok=True)
+            name = f"events-{int(now * 1000):013d}-{WORKER_ID}.seg"
+            self._segment = os.path.join(self.directory, name)
+            self._segment_started = now
+            self._segment_bytes = 0
+        return self._segment
+
+
+class MeetingStats:
+    # Interval kinds tracked per user; "mic" is unmuted time while present
+    KINDS = ("present", "mic", "muted", "cam", "share")
+
+    def __init__(self):
+        self.joins = 0
+        self.leaves = 0
+        self.chat_messages = 0
+        self.chat_chars = 0
+        self.users: set[int] = set()
+        self.connections: Dict[int, int] = {}
+        self.peak_concurrent = 0
+        self.first_ts: Optional[int] = None
+        self.last_ts: Optional[int] = None
+        self.totals: Dict[str, int] = {k: 0 for k in self.KINDS}
+        self.open: Dict[Tuple[str, int], int] = {}
+
+    def _start(self, kind: str, user_id: int, ts: int):
+        self.open.setdefault((kind, user_id), ts)
+
+    def _stop(self, kind: str, user_id: int, ts: int):
+        start = self.open.pop((kind, user_id), None)
+        if start is not None:
+            self.totals[kind] += max(ts - start, 0)
+
+    def apply(self, ts: int, user_id: int, code: int, value: int):
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts = ts
+        event = EVENT_NAMES.get(code)
+        if event == "join":
+            self.joins += 1
+            self.users.add(user_id)
+            count = self.connections.get(user_id, 0) + 1
+            self.connections[user_id] = count
+            if count == 1:
+                # Media defaults to mic/cam on at join, matching RoomState
+                self._start("present", user_id, ts)
+                self._start("mic", user_id, ts)
+                self._start("cam", user_id, ts)
+            self.peak_concurrent = max(self.peak_concurrent, len(self.connections))
+        elif event == "leave":
+            self.leaves += 1
+            count = self.connections.get(user_id, 0) - 1
+            if count > 0:
+                self.connections[user_id] = count
+                return
+            self.connections.pop(user_id, None)
+            for kind in self.KINDS:
+                self._stop(kind, user_id, ts)
+        elif event == "mute":
+            self._stop("mic", user_id, ts)
+            self._start("muted", user_id, ts)
+        elif event == "unmute":
+            self._stop("muted", user_id, ts)
+            self._start("mic", user_id, ts)
+        elif event == "camera-on":
+            self._start("cam", user_id, ts)
+        elif event == "camera-off":
+            self._stop("cam", user_id, ts)
+        elif event == "screen-share-start":
+            self._start("share", user_id, ts)
+        elif event == "screen-share-stop":
+            self._stop("share", user_id, ts)
+        elif event == "chat":
+            self.chat_messages += 1
+            self.chat_chars += value
+
+    def snapshot(self, now_ms: int) -> Dict[str, int]:
+        # Open intervals count up to now without being closed
+        totals = dict(self.totals)
+        for (kind, _), start in self.open.items():
+            totals[kind] += max(now_ms - start, 0)
+        return totals
+
+
+def _to_datetime(ms: Optional[int]) -> Optional[datetime]:
+    return datetime.utcfromtimestamp(ms / 1000) if ms is not None else None
+
+
+class AnalyticsIndex:
+    def __init__(self, directory: str = ANALYTICS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._offsets: Dict[str, int] = {}
+        self.meetings: Dict[str, MeetingStats] = {}
+
+    def refresh(self):
+        """Fold new blocks into the totals; called from the background loop."""
+        if not os.path.isdir(self.directory):
+            return
+        # Segment names start with their creation time, so this replays in
+        # roughly chronological order; a meeting's events come from its owner.
+        names = sorted(n for n in os.listdir(self.directory) if n.endswith(".seg"))
+        for name in names:
+            path = os.path.join(self.directory, name)
+            # File I/O and decoding happen outside the lock so queries never
+            # wait on a replay; only applying the decoded events is locked.
+            try:
+                events, offset = read_blocks(path, self._offsets.get(name, 0))
+            except FileNotFoundError:
+                continue
+            except ValueError:
+                # skip the damaged remainder instead of failing every refresh
+                events, offset = [], os.path.getsize(path)
+            with self._lock:
+                self._offsets[name] = offset
+                for ts, meeting_id, user_id, code, value in events:
+                    self.meetings.setdefault(meeting_id, MeetingStats()).apply(ts, user_id, code, value)
+
+    def prune(self):
+        now = time.time()
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if not name.endswith(".seg"):
+                    continue
+                try:
+                    started = int(name.split("-")[1]) / 1000
+                except (IndexError, ValueError):
+                    continue
+                # A segment stops receiving writes SEGMENT_MAX_SECONDS after it starts
+                if started + SEGMENT_MAX_SECONDS < now - SEGMENT_RETENTION_SECONDS:
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except FileNotFoundError:
+                        pass
+                    self._offsets.pop(name, None)
+        now_ms = int(now * 1000)
+        with self._lock:
+            for meeting_id in list(self.meetings):
+                st = self.meetings[meeting_id]
+                idle_ms = now_ms - (st.last_ts or 0)
+                # Finished meetings age out; ones whose leave events were lost
+                # (crashed worker) go when their segments would
+                if (not st.connections and idle_ms > MEETING_RETENTION_SECONDS * 1000) or (
+                    idle_ms > SEGMENT_RETENTION_SECONDS * 1000
+                ):
+                    del self.meetings[meeting_id]
+
+    def meeting(self, meeting_id: str) -> Optional[dict]:
+        with self._lock:
+            st = self.meetings.get(meeting_id)
+            if st is None:
+                return None
+            totals = st.snapshot(int(time.time() * 1000))
+            return {
+                "meeting_id": meeting_id,
+                "joins": st.joins,
+                "leaves": st.leaves,
+                "unique_users": len(st.users),
+                "peak_concurrent": st.peak_concurrent,
+                "active_users": len(st.connections),
+                "chat_messages": st.chat_messages,
+                "chat_chars": st.chat_chars,
+                "presence_seconds": totals["present"] / 1000,
+                "talk_seconds": totals["mic"] / 1000,
+                "mute_ratio": (totals["muted"] / totals["present"]) if totals["present"] else 0.0,
+                "camera_on_seconds": totals["cam"] / 1000,
+                "screen_share_seconds": totals["share"] / 1000,
+                "first_event_at": _to_datetime(st.first_ts),
+                "last_event_at": _to_datetime(st.last_ts),
+            }
+
+
+event_log = EventLog()
+analytics_index = AnalyticsIndex()
+
+
+async def run_index_loop():
+    # Build and keep the index warm off the request path
+    while True:
+        try:
+            await asyncio.to_thread(analytics_index.refresh)
+            await asyncio.to_thread(analytics_index.prune)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(INDEX_REFRESH_SECONDS)
+
+
+async def run_flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(event_log.flush)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # batch was requeued; retry on the next tick
+            pass
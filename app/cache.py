@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+
+class CachedEntry:
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+class ResponseCache:
+    """Pre-serialised JSON bodies for idempotent GET routes.
+
+    Entries expire after a per-route TTL and can be dropped early from the
+    write paths that change the underlying data via `invalidate`. The cache
+    is a bounded LRU; expired entries are swept on insert.
+    """
+
+    def __init__(self, max_entries: int = 10000, sweep_seconds: float = 30.0):
+        self.max_entries = max_entries
+        self.sweep_seconds = sweep_seconds
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedEntry] = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    def get(self, key: str, ttl: float, build: Callable[[], BaseModel]) -> CachedEntry:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry
+        entry = CachedEntry(build().model_dump_json().encode("utf-8"), ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if now - self._last_sweep >= self.sweep_seconds:
+                self._last_sweep = now
+                for k in [k for k, e in self._entries.items() if e.expires_at <= now]:
+                    del self._entries[k]
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def respond(
+        self,
+        request: Request,
+        key: str,
+        ttl: float,
+        build: Callable[[], BaseModel],
+        cache_control: str = "private",
+    ) -> Response:
+        entry = self.get(key, ttl, build)
+        remaining = max(int(entry.expires_at - time.monotonic()), 0)
+        headers = {"ETag": entry.etag, "Cache-Control": f"{cache_control}, max-age={remaining}"}
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+response_cache = ResponseCache()
+
+# Nothing in the app writes User rows after signup or changes the TURN list
+# at runtime, so there are no invalidation hooks yet: the TTLs below are the
+# only bound on staleness. A future write path must call
+# `response_cache.invalidate` with the matching key.
+TURN_CONFIG_KEY = "config:turn"
+TURN_CONFIG_TTL = 300
+PROFILE_TTL = 60
+
+
+def profile_key(user_id: int) -> str:
+    return f"profile:{user_id}"
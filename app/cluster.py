@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from .database import SessionLocal
+from .models import Meeting, Participant, WorkerNode
+from .sessions import participant_sessions
+from .sharding import HEARTBEAT_SECONDS, STALE_SECONDS, shard_map
+from .ws import manager
+
+
+# Ended meetings already closed out here, so later ticks do not re-broadcast
+_finished: Set[str] = set()
+
+
+def _heartbeat() -> Dict[str, str]:
+    """Refresh this worker's row and return the live membership."""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        node = db.get(WorkerNode, shard_map.worker_id)
+        if node is None:
+            db.add(WorkerNode(worker_id=shard_map.worker_id, url=shard_map.worker_url, heartbeat_at=now))
+        else:
+            node.url = shard_map.worker_url
+            node.heartbeat_at = now
+        db.commit()
+        cutoff = now - timedelta(seconds=STALE_SECONDS)
+        rows = db.query(WorkerNode).filter(WorkerNode.heartbeat_at >= cutoff).all()
+        return {r.worker_id: r.url for r in rows}
+    finally:
+        db.close()
+
+
+def deregister():
+    db = SessionLocal()
+    try:
+        db.query(WorkerNode).filter(WorkerNode.worker_id == shard_map.worker_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def close_meeting_rows(meeting_id: str):
+    db = SessionLocal()
+    try:
+        db.query(Participant).filter(
+            Participant.meeting_id == meeting_id, Participant.open_key.is_not(None)
+        ).update({Participant.left_at: datetime.utcnow(), Participant.open_key: None}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def finish_meeting(meeting_id: str):
+    """Close out an ended meeting on the worker holding its sockets."""
+    _finished.add(meeting_id)
+    # write queued joins first so the bulk close below covers them
+    try:
+        await asyncio.to_thread(participant_sessions.flush)
+    except Exception:
+        pass
+    await asyncio.to_thread(close_meeting_rows, meeting_id)
+    participant_sessions.forget_meeting(meeting_id)
+    # broadcast meeting ended over websockets
+    try:
+        await manager.broadcast(meeting_id, {"type": "meeting-ended"})
+    except Exception:
+        pass
+
+
+def _ended_meetings(meeting_ids: List[str]) -> List[str]:
+    if not meeting_ids:
+        return []
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(Meeting.meeting_id)
+            .filter(Meeting.meeting_id.in_(meeting_ids), Meeting.ended_at.is_not(None))
+            .all()
+        )
+        return [r[0] for r in rows]
+    finally:
+        db.close()
+
+
+async def finish_ended_meetings():
+    # /meeting/end may have been served by a worker that does not own the
+    # room; the owner notices ended_at here and notifies its own sockets
+    _finished.intersection_update(manager.rooms.keys())
+    pending = [m for m in manager.rooms.keys() if m not in _finished]
+    for meeting_id in await asyncio.to_thread(_ended_meetings, pending):
+        await finish_meeting(meeting_id)
+
+
+async def rebalance():
+    # Rooms that moved to another worker are handed off; clients reconnect there.
+    for meeting_id in list(manager.rooms.keys()):
+        if not shard_map.is_local(meeting_id):
+            await manager.handoff(meeting_id)
+
+
+async def run_membership_loop():
+    while not manager.draining:
+        try:
+            members = await asyncio.to_thread(_heartbeat)
+            if shard_map.update(members):
+                await rebalance()
+            await finish_ended_meetings()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # DB hiccup: keep the last known ring and retry on the next tick
+            pass
+        await asyncio.sleep(HEARTBEAT_SECONDS)
@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import os
 from typing import Any, Dict, Optional
 
 from jose import jwt, JWTError
@@ -9,6 +10,10 @@ from passlib.context import CryptContext
 JWT_SECRET = "SUPER_SECRET_JWT_BAAPMEET_2025"
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+RESUME_TOKEN_MINUTES = 2
+# Shared secret for operational endpoints (X-Admin-Token header). Unset
+# disables them entirely.
+ADMIN_TOKEN = os.environ.get("BAAPMEET_ADMIN_TOKEN", "")
 
 # Use bcrypt_sha256 to avoid bcrypt's 72-byte password limit while
 # still leveraging bcrypt for secure storage. Keep plain bcrypt for
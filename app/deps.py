@@ -10,6 +10,17 @@ from .models import User
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
+def get_current_user_id(creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme)) -> int:
+    # Token-only check for cached routes; does not look the user up
+    if creds is None or not creds.credentials:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+    payload = decode_token(creds.credentials)
+    if not payload or "sub" not in payload or payload.get("typ") == "resume":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return int(payload["sub"])
+
+
 def get_current_user(
     creds: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: Session = Depends(get_db),
@@ -18,7 +29,7 @@ def get_current_user(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
     payload = decode_token(creds.credentials)
-    if not payload or "sub" not in payload:
+    if not payload or "sub" not in payload or payload.get("typ") == "resume":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
     user = db.query(User).filter(User.id == int(payload["sub"])).first()
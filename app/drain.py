@@ -0,0 +1,61 @@
+import asyncio
+import random
+
+from .analytics import event_log
+from .sessions import participant_sessions
+from .sharding import shard_map
+from .ws import DRAIN_JITTER_MS, Connection, create_resume_token, manager, reconnect_hint
+from . import cluster
+
+
+async def _hint(meeting_id: str, conn: Connection):
+    resume = create_resume_token(meeting_id, conn.user_id, conn.name)
+    try:
+        await conn.websocket.send_text(reconnect_hint(meeting_id, random.randint(0, DRAIN_JITTER_MS), resume))
+    except Exception:
+        pass
+
+
+async def _close(conn: Connection):
+    try:
+        await conn.websocket.close(code=1012)
+    except Exception:
+        pass
+
+
+async def drain() -> int:
+    """Stop accepting WS connects and move every client off this worker.
+
+    Returns the number of connections that were drained.
+    """
+    if manager.draining:
+        return 0
+    manager.draining = True
+
+    if shard_map.enabled:
+        # Leave the ring first so reconnect hints point at the new owners
+        shard_map.leave()
+        try:
+            await asyncio.to_thread(cluster.deregister)
+        except Exception:
+            pass
+
+    conns = [(meeting_id, c) for meeting_id, room in manager.rooms.items() for c in list(room)]
+    for _, c in conns:
+        c.drained = True
+
+    await asyncio.gather(*(_hint(meeting_id, c) for meeting_id, c in conns), return_exceptions=True)
+    # Flush pending joins and close every open session in one batch
+    participant_sessions.close_all()
+    try:
+        await asyncio.to_thread(participant_sessions.flush)
+    except Exception:
+        pass
+    for meeting_id, c in conns:
+        event_log.record(meeting_id, c.user_id, "leave")
+    try:
+        await asyncio.to_thread(event_log.flush)
+    except Exception:
+        pass
+    await asyncio.gather(*(_close(c) for _, c in conns), return_exceptions=True)
+    return len(conns)
@@ -1,14 +1,24 @@
+import asyncio
+import signal
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine, Base
+from .migrations import check_schema
 from .routers import auth as auth_router
 from .routers import users as users_router
 from .routers import meetings as meetings_router
 from .routers import config as config_router
 from .routers import logs as logs_router
 from .routers import health as health_router
+from .routers import admin as admin_router
+from .routers import analytics as analytics_router
 from . import ws as ws_module
+from . import cluster
+from . import sessions
+from . import analytics
+from .drain import drain
+from .sharding import shard_map
 
 
 def create_app() -> FastAPI:
@@ -36,11 +46,65 @@ def create_app() -> FastAPI:
     app.include_router(logs_router.router)
     app.include_router(ws_module.router)
     app.include_router(health_router.router)
+    app.include_router(admin_router.router)
+    app.include_router(analytics_router.router)
 
     @app.on_event("startup")
     def on_startup():
-        # Auto-create tables at startup
-        Base.metadata.create_all(bind=engine)
+        # Fast schema-version check; DDL runs via `python -m app.migrations upgrade`
+        check_schema()
+
+    @app.on_event("startup")
+    async def start_cluster():
+        # Join the worker ring only when this process has a public WS URL
+        if shard_map.enabled:
+            app.state.membership_task = asyncio.create_task(cluster.run_membership_loop())
+
+    @app.on_event("startup")
+    async def start_session_flusher():
+        app.state.session_flush_task = asyncio.create_task(sessions.run_flush_loop())
+
+    @app.on_event("startup")
+    async def start_event_log_flusher():
+        app.state.event_flush_task = asyncio.create_task(analytics.run_flush_loop())
+        app.state.event_index_task = asyncio.create_task(analytics.run_index_loop())
+
+    @app.on_event("startup")
+    async def install_drain_signal():
+        # `kill -USR1 <pid>` drains this worker before the deploy sends SIGTERM
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, lambda: asyncio.ensure_future(drain()))
+        except (NotImplementedError, AttributeError, RuntimeError, ValueError):
+            # No signal handlers off the main thread (e.g. TestClient); use
+            # /admin/drain there
+            pass
+
+    @app.on_event("shutdown")
+    async def stop_cluster():
+        task = getattr(app.state, "membership_task", None)
+        if task is not None:
+            task.cancel()
+            # Shutdown handlers run unguarded in order; a DB outage here must
+            # not skip the session and event-log flushes below
+            try:
+                await asyncio.to_thread(cluster.deregister)
+            except Exception:
+                pass
+
+    @app.on_event("shutdown")
+    async def stop_session_flusher():
+        app.state.session_flush_task.cancel()
+        try:
+            await asyncio.to_thread(sessions.participant_sessions.flush)
+        except Exception:
+            pass
+
+    @app.on_event("shutdown")
+    async def stop_event_log_flusher():
+        app.state.event_flush_task.cancel()
+        app.state.event_index_task.cancel()
+        await asyncio.to_thread(analytics.event_log.flush)
 
     return app
 
@@ -0,0 +1,276 @@
+"""Versioned schema migrations.
+
+Workers only run a single `SELECT MAX(version)` at boot (see `check_schema`);
+DDL is applied out of band before a deploy:
+
+    python -m app.migrations upgrade
+    python -m app.migrations current
+
+Every step is idempotent so databases created by the old `create_all` startup
+hook can be upgraded in place.
+"""
+import os
+import sys
+from typing import Callable, List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import ProgrammingError
+
+from .database import get_engine
+
+
+# Set to 1 to let a worker apply pending migrations itself (dev convenience)
+MIGRATE_ON_BOOT = os.environ.get("BAAPMEET_MIGRATE_ON_BOOT", "0") == "1"
+LOCK_NAME = "baapmeet_schema_migrations"
+LOCK_TIMEOUT_SECONDS = 60
+ER_NO_SUCH_TABLE = 1146
+
+
+def _column_exists(conn: Connection, table: str, column: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                "SELECT COUNT(*) FROM information_schema.columns "
+                "WHERE table_schema = DATABASE() AND table_name = :t AND column_name = :c"
+            ),
+            {"t": table, "c": column},
+        ).scalar()
+    )
+
+
+def _index_exists(conn: Connection, table: str, index: str) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                "SELECT COUNT(*) FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = :t AND index_name = :i"
+            ),
+            {"t": table, "i": index},
+        ).scalar()
+    )
+
+
+def _create_index(conn: Connection, table: str, index: str, ddl: str):
+    if not _index_exists(conn, table, index):
+        conn.exec_driver_sql(ddl)
+
+
+def _add_column(conn: Connection, table: str, column: str, ddl: str):
+    if not _column_exists(conn, table, column):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+
+
+def _v1_baseline(conn: Connection):
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER NOT NULL AUTO_INCREMENT,
+            name VARCHAR(100) NOT NULL,
+            email VARCHAR(255) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            created_at DATETIME NOT NULL,
+            PRIMARY KEY (id)
+        )
+        """
+    )
+    _create_index(conn, "users", "ix_users_id", "CREATE INDEX ix_users_id ON users (id)")
+    _create_index(conn, "users", "ix_users_email", "CREATE UNIQUE INDEX ix_users_email ON users (email)")
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS meetings (
+            id INTEGER NOT NULL AUTO_INCREMENT,
+            meeting_id VARCHAR(36) NOT NULL,
+            host_id INTEGER NOT NULL,
+            created_at DATETIME NOT NULL,
+            ended_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY (host_id) REFERENCES users (id)
+        )
+        """
+    )
+    _create_index(
+        conn, "meetings", "ix_meetings_meeting_id", "CREATE UNIQUE INDEX ix_meetings_meeting_id ON meetings (meeting_id)"
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER NOT NULL AUTO_INCREMENT,
+            meeting_id VARCHAR(36) NOT NULL,
+            user_id INTEGER NOT NULL,
+            message TEXT NOT NULL,
+            timestamp DATETIME NOT NULL,
+            PRIMARY KEY (id),
+            FOREIGN KEY (meeting_id) REFERENCES meetings (meeting_id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+    _create_index(
+        conn,
+        "chat_messages",
+        "ix_chat_messages_meeting_id",
+        "CREATE INDEX ix_chat_messages_meeting_id ON chat_messages (meeting_id)",
+    )
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS participants (
+            id INTEGER NOT NULL AUTO_INCREMENT,
+            meeting_id VARCHAR(36) NOT NULL,
+            user_id INTEGER NOT NULL,
+            joined_at DATETIME NOT NULL,
+            left_at DATETIME,
+            PRIMARY KEY (id),
+            FOREIGN KEY (meeting_id) REFERENCES meetings (meeting_id),
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        )
+        """
+    )
+    _create_index(
+        conn, "participants", "ix_participants_user_id", "CREATE INDEX ix_participants_user_id ON participants (user_id)"
+    )
+    _create_index(
+        conn,
+        "participants",
+        "ix_participants_meeting_id",
+        "CREATE INDEX ix_participants_meeting_id ON participants (meeting_id)",
+    )
+
+
+def _v2_worker_nodes(conn: Connection):
+    conn.exec_driver_sql(
+        """
+        CREATE TABLE IF NOT EXISTS worker_nodes (
+            worker_id VARCHAR(64) NOT NULL,
+            url VARCHAR(255) NOT NULL,
+            heartbeat_at DATETIME NOT NULL,
+            PRIMARY KEY (worker_id)
+        )
+        """
+    )
+    _create_index(
+        conn,
+        "worker_nodes",
+        "ix_worker_nodes_heartbeat_at",
+        "CREATE INDEX ix_worker_nodes_heartbeat_at ON worker_nodes (heartbeat_at)",
+    )
+
+
+def _v3_meeting_mode(conn: Connection):
+    _add_column(conn, "meetings", "title", "title VARCHAR(255) NULL")
+    _add_column(conn, "meetings", "mode", "mode VARCHAR(16) NOT NULL DEFAULT 'meeting'")
+    _add_column(conn, "meetings", "panelist_ids", "panelist_ids JSON NULL")
+
+
+def _v4_participant_open_key(conn: Connection):
+    _add_column(conn, "participants", "open_key", "open_key INTEGER NULL")
+    # Close duplicate open rows (keep the newest) so the unique key can be built
+    conn.exec_driver_sql(
+        """
+        UPDATE participants p
+        JOIN (
+            SELECT meeting_id, user_id, MAX(id) AS keep_id
+            FROM participants
+            WHERE left_at IS NULL
+            GROUP BY meeting_id, user_id
+        ) k ON p.meeting_id = k.meeting_id AND p.user_id = k.user_id
+        SET p.left_at = UTC_TIMESTAMP()
+        WHERE p.left_at IS NULL AND p.id <> k.keep_id
+        """
+    )
+    conn.exec_driver_sql("UPDATE participants SET open_key = 1 WHERE left_at IS NULL")
+    conn.exec_driver_sql("UPDATE participants SET open_key = NULL WHERE left_at IS NOT NULL")
+    _create_index(
+        conn,
+        "participants",
+        "uq_participants_open_session",
+        "CREATE UNIQUE INDEX uq_participants_open_session ON participants (meeting_id, user_id, open_key)",
+    )
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline schema", _v1_baseline),
+    (2, "worker_nodes table for room sharding", _v2_worker_nodes),
+    (3, "meeting title/mode/panelists", _v3_meeting_mode),
+    (4, "participants open_key unique session", _v4_participant_open_key),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn: Connection) -> int:
+    try:
+        return int(conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0)
+    except ProgrammingError as exc:
+        # Only "table doesn't exist" means a fresh schema; connection or auth
+        # failures must surface instead of looking like v0
+        args = getattr(exc.orig, "args", ())
+        if args and args[0] == ER_NO_SUCH_TABLE:
+            return 0
+        raise
+
+
+def upgrade() -> int:
+    """Apply pending migrations; returns the resulting version."""
+    with get_engine().connect() as conn:
+        # Serialise concurrent upgraders (e.g. several workers with MIGRATE_ON_BOOT)
+        got = conn.execute(text("SELECT GET_LOCK(:n, :t)"), {"n": LOCK_NAME, "t": LOCK_TIMEOUT_SECONDS}).scalar()
+        if got != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            conn.exec_driver_sql(
+                """
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER NOT NULL,
+                    description VARCHAR(255) NOT NULL,
+                    applied_at DATETIME NOT NULL,
+                    PRIMARY KEY (version)
+                )
+                """
+            )
+            version = current_version(conn)
+            for number, description, step in MIGRATIONS:
+                if number <= version:
+                    continue
+                step(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, UTC_TIMESTAMP())"),
+                    {"v": number, "d": description},
+                )
+                version = number
+            return version
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:n)"), {"n": LOCK_NAME})
+
+
+def check_schema():
+    """Boot-time check: one query, no reflection or DDL unless opted in."""
+    with get_engine().connect() as conn:
+        version = current_version(conn)
+    # A newer schema is fine: migrations are additive, so old workers keep
+    # serving during a rolling deploy
+    if version >= LATEST_VERSION:
+        return
+    if MIGRATE_ON_BOOT:
+        upgrade()
+        return
+    raise RuntimeError(
+        f"Database schema is at v{version}, this build needs v{LATEST_VERSION}; "
+        "run `python -m app.migrations upgrade`"
+    )
+
+
+def main(argv: List[str]) -> int:
+    command = argv[0] if argv else "upgrade"
+    if command == "upgrade":
+        print(f"schema at v{upgrade()}")
+    elif command == "current":
+        with get_engine().connect() as conn:
+            print(f"schema at v{current_version(conn)} (latest v{LATEST_VERSION})")
+    else:
+        print("usage: python -m app.migrations [upgrade|current]")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,6 +1,6 @@
 from datetime import datetime
 import uuid as uuidpkg
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Text, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 
 from .database import Base
@@ -26,6 +26,10 @@ class Meeting(Base):
     
     meeting_id: Mapped[str] = mapped_column(String(36), unique=True, nullable=False, index=True, default=lambda: str(uuidpkg.uuid4()))
     host_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
+    title: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    # "meeting" (everyone is a peer) or "webinar" (host + panelists, rest audience)
+    mode: Mapped[str] = mapped_column(String(16), default="meeting", nullable=False)
+    panelist_ids: Mapped[list[int] | None] = mapped_column(JSON, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     ended_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
 
@@ -36,12 +40,18 @@ class Meeting(Base):
 
 class Participant(Base):
     __tablename__ = "participants"
+    # open_key is 1 while the session is open and NULL once left. MySQL allows
+    # repeated NULLs in a unique index, so this enforces one open row per user.
+    __table_args__ = (
+        UniqueConstraint("meeting_id", "user_id", "open_key", name="uq_participants_open_session"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     meeting_id: Mapped[str] = mapped_column(String(36), ForeignKey("meetings.meeting_id"), index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), index=True)
     joined_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
     left_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    open_key: Mapped[int | None] = mapped_column(Integer, nullable=True, default=1)
 
     meeting = relationship("Meeting", back_populates="participants")
     user = relationship("User")
@@ -58,3 +68,11 @@ class ChatMessage(Base):
 
     meeting = relationship("Meeting", back_populates="messages")
     user = relationship("User", back_populates="messages")
+
+
+class WorkerNode(Base):
+    __tablename__ = "worker_nodes"
+
+    worker_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    url: Mapped[str] = mapped_column(String(255), nullable=False)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
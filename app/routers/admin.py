@@ -0,0 +1,20 @@
+import secrets
+
+from fastapi import APIRouter, Header, HTTPException, status
+
+from ..core import ADMIN_TOKEN
+from ..drain import drain
+from ..schemas import DrainResponse
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+@router.post("/drain", response_model=DrainResponse)
+async def drain_worker(x_admin_token: str | None = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    drained = await drain()
+    return DrainResponse(message="Worker draining", connections=drained)
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from ..analytics import analytics_index
+from ..deps import get_current_user_id
+from ..schemas import MeetingAnalytics
+
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+
+@router.get("/meetings/{meeting_id}", response_model=MeetingAnalytics)
+def get_meeting_analytics(meeting_id: str, user_id: int = Depends(get_current_user_id)):
+    # Served from the index built in the background from event segments; no OLTP queries
+    stats = analytics_index.meeting(meeting_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="No analytics for meeting")
+    return MeetingAnalytics(**stats)
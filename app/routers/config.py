@@ -1,4 +1,6 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+
+from ..cache import response_cache, TURN_CONFIG_KEY, TURN_CONFIG_TTL
 from ..schemas import TurnConfigResponse, IceServer
 
 
@@ -6,7 +8,12 @@ router = APIRouter(prefix="/config", tags=["Config"])
 
 
 @router.get("/turn", response_model=TurnConfigResponse)
-def get_turn_config():
+def get_turn_config(request: Request):
+    # Polled on every page load/reconnect: serve cached bytes with an ETag
+    return response_cache.respond(request, TURN_CONFIG_KEY, TURN_CONFIG_TTL, _build_turn_config)
+
+
+def _build_turn_config() -> TurnConfigResponse:
     # Expanded ICE server list for better NAT traversal.
     # Make sure your COTURN is listening on these ports and transports.
     return TurnConfigResponse(
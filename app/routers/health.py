@@ -1,6 +1,9 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 from datetime import datetime
 
+from ..ws import manager
+
 router = APIRouter(prefix="/health", tags=["Health"])
 
 @router.get("/")
@@ -8,7 +11,17 @@ def health_check():
     """
     Health check endpoint to verify if the server is running.
     Returns status, message, and current server time.
+    Responds 503 while the worker drains so load balancers stop routing to it.
     """
+    if manager.draining:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "draining",
+                "message": "BaapMeet backend is draining",
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+            },
+        )
     return {
         "status": "ok",
         "message": "BaapMeet backend is healthy ",
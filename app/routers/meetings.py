@@ -1,14 +1,16 @@
 from datetime import datetime
-from typing import List
+from typing import Dict
+import asyncio
 import secrets
 import string
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from ..database import get_db
 from ..deps import get_current_user
 from ..models import Meeting, Participant, User, ChatMessage
+from ..sessions import participant_sessions
 from ..schemas import (
     MeetingCreateRequest,
     MeetingCreateResponse,
@@ -19,12 +21,28 @@ from ..schemas import (
     MessageResponse,
     ChatMessageOut,
 )
-from ..ws import manager
+from ..sharding import shard_map
+from .. import cluster
 
 
 router = APIRouter(prefix="/meeting", tags=["Meeting"])
 
 
+def _open_participants(db: Session, meeting_id: str) -> Dict[int, str]:
+    # With sharding on, the owning worker holds every WS session of the meeting
+    # in memory. Without it (e.g. `uvicorn --workers N`) each process only
+    # sees its own sockets, so the DB is the source of truth.
+    if shard_map.enabled and shard_map.is_local(meeting_id):
+        return participant_sessions.open_users(meeting_id)
+    rows = (
+        db.query(Participant.user_id, User.name)
+        .join(User, User.id == Participant.user_id)
+        .filter(Participant.meeting_id == meeting_id, Participant.open_key.is_not(None))
+        .all()
+    )
+    return {user_id: name for user_id, name in rows}
+
+
 def _generate_meet_code() -> str:
     letters = string.ascii_lowercase
     part1 = ''.join(secrets.choice(letters) for _ in range(3))
@@ -44,14 +62,26 @@ def create_meeting(
     while db.query(Meeting).filter(Meeting.meeting_id == code).first() is not None:
         code = _generate_meet_code()
 
-    meeting = Meeting(host_id=current_user.id, meeting_id=code)
+    panelists = sorted(set(payload.panelists) - {current_user.id}) if payload.mode == "webinar" else None
+    meeting = Meeting(
+        host_id=current_user.id,
+        meeting_id=code,
+        title=payload.title,
+        mode=payload.mode,
+        panelist_ids=panelists,
+    )
     db.add(meeting)
     db.commit()
     db.refresh(meeting)
 
     # Return a Meet-like URL (frontend can choose to use this directly)
     join_url = f"https://meet.google.com/{meeting.meeting_id}"
-    return MeetingCreateResponse(meeting_id=meeting.meeting_id, join_url=join_url)
+    return MeetingCreateResponse(
+        meeting_id=meeting.meeting_id,
+        join_url=join_url,
+        mode=meeting.mode,
+        ws_url=shard_map.ws_url(meeting.meeting_id),
+    )
 
 
 @router.post("/join", response_model=MeetingJoinResponse)
@@ -68,27 +98,29 @@ def join_meeting(
     if meeting.ended_at is not None:
         raise HTTPException(status_code=400, detail="Meeting already ended")
 
-    # Check if already joined and not left
-    participant = (
-        db.query(Participant)
-        .filter(Participant.meeting_id == payload.meeting_id, Participant.user_id == current_user.id, Participant.left_at.is_(None))
-        .first()
-    )
-    if not participant:
-        participant = Participant(meeting_id=payload.meeting_id, user_id=current_user.id)
-        db.add(participant)
-        db.commit()
-
-    # Participants list
-    joins: List[Participant] = (
-        db.query(Participant).filter(Participant.meeting_id == str(payload.meeting_id), Participant.left_at.is_(None)).all()
+    # Idempotent: the session service upserts the open row in its next batch
+    participant_sessions.record_join(meeting.meeting_id, current_user.id)
+
+    # Participants list. Webinars only list the panel; the audience is paged
+    # through /meeting/{id}/participants or the WS "roster" message.
+    panel_ids = [meeting.host_id, *(meeting.panelist_ids or [])]
+    role = "panelist"
+    open_users = _open_participants(db, meeting.meeting_id)
+    open_users.setdefault(current_user.id, current_user.name)
+    if meeting.mode == "webinar":
+        open_users = {uid: name for uid, name in open_users.items() if uid in panel_ids}
+        if current_user.id not in panel_ids:
+            role = "audience"
+    participants = [ParticipantInfo(id=uid, name=name) for uid, name in sorted(open_users.items())]
+
+    return MeetingJoinResponse(
+        message="Joined successfully",
+        participants=participants,
+        host_id=meeting.host_id,
+        mode=meeting.mode,
+        role=role,
+        ws_url=shard_map.ws_url(meeting.meeting_id),
     )
-    participants = []
-    for j in joins:
-        u = db.get(User, j.user_id)
-        participants.append(ParticipantInfo(id=j.user_id, name=u.name if u else "User"))
-
-    return MeetingJoinResponse(message="Joined successfully", participants=participants, host_id=meeting.host_id)
 
 
 @router.post("/end", response_model=MessageResponse)
@@ -108,29 +140,44 @@ async def end_meeting(
 
     if meeting.ended_at is None:
         meeting.ended_at = datetime.utcnow()
-        # mark active participants as left
-        db.query(Participant).filter(
-            Participant.meeting_id == payload.meeting_id, Participant.left_at.is_(None)
-        ).update({Participant.left_at: datetime.utcnow()})
         db.commit()
-        # broadcast meeting ended over websockets
-        try:
-            await manager.broadcast(str(meeting.meeting_id), {"type": "meeting-ended"})
-        except Exception:
-            pass
+        if shard_map.is_local(meeting.meeting_id):
+            await cluster.finish_meeting(meeting.meeting_id)
+        else:
+            # The owner's membership loop sees ended_at within one heartbeat,
+            # flushes its queued joins, closes rows again and notifies its
+            # sockets. Close rows now so the DB is right in the meantime.
+            await asyncio.to_thread(cluster.close_meeting_rows, meeting.meeting_id)
 
     return MessageResponse(message="Meeting ended successfully")
 
 
 @router.get("/{meeting_id}/participants", response_model=list[ParticipantInfo])
-def list_participants(meeting_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_participants(
+    meeting_id: str,
+    offset: int = Query(default=0, ge=0),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
     meeting = db.query(Meeting).filter(Meeting.meeting_id == meeting_id).first()
     if not meeting:
         raise HTTPException(status_code=404, detail="Meeting not found")
-    joins = (
-        db.query(Participant).filter(Participant.meeting_id == meeting_id, Participant.left_at.is_(None)).all()
-    )
-    return [ParticipantInfo(id=j.user_id, name=(db.get(User, j.user_id)).name) for j in joins]
+    if shard_map.enabled and shard_map.is_local(meeting_id):
+        users = participant_sessions.open_page(meeting_id, offset, limit)
+    else:
+        # Page in SQL so large webinars are not sorted in Python per request
+        query = (
+            db.query(Participant.user_id, User.name)
+            .join(User, User.id == Participant.user_id)
+            .filter(Participant.meeting_id == meeting_id, Participant.open_key.is_not(None))
+            .order_by(Participant.user_id)
+            .offset(offset)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        users = query.all()
+    return [ParticipantInfo(id=uid, name=name) for uid, name in users]
 
 
 @router.get("/{meeting_id}/chat", response_model=list[ChatMessageOut])
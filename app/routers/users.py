@@ -1,5 +1,9 @@
-from fastapi import APIRouter, Depends
-from ..deps import get_current_user
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from ..cache import response_cache, profile_key, PROFILE_TTL
+from ..database import get_db
+from ..deps import get_current_user_id
 from ..schemas import ProfileResponse
 from ..models import User
 
@@ -8,6 +12,12 @@ router = APIRouter(prefix="/user", tags=["User"])
 
 
 @router.get("/profile", response_model=ProfileResponse)
-def get_profile(current_user: User = Depends(get_current_user)):
-    return current_user
+def get_profile(request: Request, user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db)):
+    def build() -> ProfileResponse:
+        user = db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        return ProfileResponse.model_validate(user)
 
+    # Cache hits skip the users lookup and serialisation entirely
+    return response_cache.respond(request, profile_key(user_id), PROFILE_TTL, build)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -39,11 +39,16 @@ class ProfileResponse(UserOut):
 # Meeting
 class MeetingCreateRequest(BaseModel):
     title: Optional[str] = Field(default=None, max_length=255)
+    mode: Literal["meeting", "webinar"] = "meeting"
+    # Webinar only: user ids that join as panelists alongside the host
+    panelists: List[int] = Field(default_factory=list, max_length=100)
 
 
 class MeetingCreateResponse(BaseModel):
     meeting_id: str
     join_url: str
+    mode: str = "meeting"
+    ws_url: Optional[str] = None
 
 
 class MeetingJoinRequest(BaseModel):
@@ -59,6 +64,9 @@ class MeetingJoinResponse(BaseModel):
     message: str
     participants: List[ParticipantInfo]
     host_id: int
+    mode: str = "meeting"
+    role: str = "panelist"
+    ws_url: Optional[str] = None
 
 
 class MeetingEndRequest(BaseModel):
@@ -92,6 +100,31 @@ class TurnConfigResponse(BaseModel):
     iceServers: List[IceServer]
 
 
+# Admin
+class DrainResponse(BaseModel):
+    message: str
+    connections: int
+
+
+# Analytics
+class MeetingAnalytics(BaseModel):
+    meeting_id: str
+    joins: int
+    leaves: int
+    unique_users: int
+    peak_concurrent: int
+    active_users: int
+    chat_messages: int
+    chat_chars: int
+    presence_seconds: float
+    talk_seconds: float
+    mute_ratio: float
+    camera_on_seconds: float
+    screen_share_seconds: float
+    first_event_at: Optional[datetime]
+    last_event_at: Optional[datetime]
+
+
 # Logs
 class MeetingLog(BaseModel):
     meeting_id: str
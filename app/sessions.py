@@ -0,0 +1,191 @@
+import asyncio
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+from .database import SessionLocal
+from .models import Participant
+
+
+FLUSH_SECONDS = 0.25
+
+Key = Tuple[str, int]
+
+
+class ParticipantSessionService:
+    """In-memory view of open participant sessions with batched DB writes.
+
+    Join/leave transitions are queued and written by `flush()`: one upsert for
+    all joins and one UPDATE per leave phase, relying on the
+    uq_participants_open_session constraint so racing joins collapse into a
+    single open row. Callers read the open set from memory instead of querying
+    `participants`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # serialises flushes so a leave never lands before its join
+        self._flush_lock = threading.Lock()
+        # meeting_id -> user_id -> display name
+        self.open: Dict[str, Dict[int, str]] = {}
+        # meeting_id -> sorted user ids of `open`, for paging
+        self.open_ids: Dict[str, List[int]] = {}
+        # live WS connections per session
+        self.refs: Dict[Key, int] = {}
+        # ordered "join"/"leave" transitions not yet written
+        self.pending: Dict[Key, List[Tuple[str, datetime]]] = {}
+
+    def open_session(self, meeting_id: str, user_id: int, name: str):
+        key = (meeting_id, user_id)
+        with self._lock:
+            self.refs[key] = self.refs.get(key, 0) + 1
+            users = self.open.setdefault(meeting_id, {})
+            if user_id not in users:
+                users[user_id] = name
+                bisect.insort(self.open_ids.setdefault(meeting_id, []), user_id)
+                self.pending.setdefault(key, []).append(("join", datetime.utcnow()))
+
+    def record_join(self, meeting_id: str, user_id: int):
+        # REST joins only upsert the row. They stay out of the in-memory open
+        # set, since the socket that later closes it may live on another worker.
+        with self._lock:
+            self.pending.setdefault((meeting_id, user_id), []).append(("join", datetime.utcnow()))
+
+    def close_session(self, meeting_id: str, user_id: int) -> bool:
+        """Drop one connection; returns True when that closed the session."""
+        key = (meeting_id, user_id)
+        with self._lock:
+            left = self.refs.get(key, 0) - 1
+            if left > 0:
+                self.refs[key] = left
+                return False
+            self.refs.pop(key, None)
+            users = self.open.get(meeting_id)
+            if users is None or users.pop(user_id, None) is None:
+                return False
+            ids = self.open_ids.get(meeting_id, [])
+            i = bisect.bisect_left(ids, user_id)
+            if i < len(ids) and ids[i] == user_id:
+                del ids[i]
+            if not users:
+                self.open.pop(meeting_id, None)
+                self.open_ids.pop(meeting_id, None)
+            self.pending.setdefault(key, []).append(("leave", datetime.utcnow()))
+            return True
+
+    def close_all(self) -> int:
+        """Queue a leave for every open session (used on drain)."""
+        with self._lock:
+            count = 0
+            for meeting_id, users in self.open.items():
+                for user_id in users:
+                    self.pending.setdefault((meeting_id, user_id), []).append(("leave", datetime.utcnow()))
+                    count += 1
+            self.open.clear()
+            self.open_ids.clear()
+            self.refs.clear()
+            return count
+
+    def forget_meeting(self, meeting_id: str):
+        # The meeting was ended with its own bulk UPDATE; drop local state
+        with self._lock:
+            self.open.pop(meeting_id, None)
+            self.open_ids.pop(meeting_id, None)
+            for key in [k for k in self.refs if k[0] == meeting_id]:
+                self.refs.pop(key, None)
+
+    def open_users(self, meeting_id: str) -> Dict[int, str]:
+        with self._lock:
+            return dict(self.open.get(meeting_id, {}))
+
+    def open_page(self, meeting_id: str, offset: int, limit: Optional[int]) -> List[Tuple[int, str]]:
+        """Open sessions ordered by user id, sliced without sorting the set."""
+        with self._lock:
+            users = self.open.get(meeting_id, {})
+            ids = self.open_ids.get(meeting_id, [])
+            end = None if limit is None else offset + limit
+            return [(uid, users[uid]) for uid in ids[offset:end]]
+
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return
+
+        first_leaves: List[Key] = []
+        joins: List[Tuple[Key, datetime]] = []
+        last_leaves: List[Key] = []
+        for key, ops in pending.items():
+            ops = _collapse(ops)
+            if ops[0][0] == "leave":
+                first_leaves.append(key)
+            if any(op == "join" for op, _ in ops):
+                joins.append((key, next(ts for op, ts in ops if op == "join")))
+                if ops[-1][0] == "leave":
+                    last_leaves.append(key)
+
+        db = SessionLocal()
+        try:
+            self._close_rows(db, first_leaves)
+            if joins:
+                stmt = mysql_insert(Participant).values(
+                    [{"meeting_id": m, "user_id": u, "joined_at": ts, "open_key": 1} for (m, u), ts in joins]
+                )
+                db.execute(stmt.on_duplicate_key_update(open_key=stmt.inserted.open_key))
+            self._close_rows(db, last_leaves)
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Put the batch back in front of anything queued meanwhile,
+            # collapsed so a long outage keeps at most three ops per session
+            with self._lock:
+                for key, ops in self.pending.items():
+                    pending.setdefault(key, []).extend(ops)
+                self.pending = {key: _collapse(ops) for key, ops in pending.items()}
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _close_rows(db, keys: List[Key]):
+        if not keys:
+            return
+        db.query(Participant).filter(
+            tuple_(Participant.meeting_id, Participant.user_id).in_(keys),
+            Participant.open_key.is_not(None),
+        ).update({Participant.left_at: datetime.utcnow(), Participant.open_key: None}, synchronize_session=False)
+
+
+def _collapse(ops: List[Tuple[str, datetime]]) -> List[Tuple[str, datetime]]:
+    # Reduce a session's transitions to [leave] [join] [leave], which is all
+    # a flush writes. Flaps shorter than one flush interval are not recorded.
+    out = ops[:1] if ops[0][0] == "leave" else []
+    last_join = next((i for i in range(len(ops) - 1, -1, -1) if ops[i][0] == "join"), None)
+    if last_join is not None:
+        out.append(ops[last_join])
+        if ops[-1][0] == "leave":
+            out.append(ops[-1])
+    return out
+
+
+participant_sessions = ParticipantSessionService()
+
+
+async def run_flush_loop():
+    while True:
+        await asyncio.sleep(FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(participant_sessions.flush)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # batch was requeued; retry on the next tick
+            pass
@@ -0,0 +1,114 @@
+import bisect
+import hashlib
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Cluster identity comes from the process environment so several uvicorn
+# processes (one per port) can run from the same code. WORKER_URL is the public
+# WebSocket base of this process (e.g. ws://10.0.0.5:8001). With no WORKER_URL
+# set the ring contains only this process and every meeting is local.
+WORKER_ID = os.environ.get("BAAPMEET_WORKER_ID", f"worker-{os.getpid()}")
+WORKER_URL = os.environ.get("BAAPMEET_WORKER_URL", "")
+HEARTBEAT_SECONDS = 5
+STALE_SECONDS = 15
+RING_REPLICAS = 128
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent hash ring mapping meeting codes to worker ids.
+
+    Each worker owns RING_REPLICAS virtual points, so adding or removing a
+    worker only moves roughly 1/N of the meetings.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = RING_REPLICAS):
+        self.replicas = replicas
+        self._points: List[Tuple[int, str]] = []
+        self._keys: List[int] = []
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> set[str]:
+        return set(self._nodes)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            bisect.insort(self._points, (_hash(f"{node}#{i}"), node))
+        self._keys = [p[0] for p in self._points]
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        self._points = [p for p in self._points if p[1] != node]
+        self._keys = [p[0] for p in self._points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        idx = bisect.bisect(self._keys, _hash(key)) % len(self._points)
+        return self._points[idx][1]
+
+
+class ShardMap:
+    def __init__(self, worker_id: str = WORKER_ID, worker_url: str = WORKER_URL):
+        self.worker_id = worker_id
+        self.worker_url = worker_url
+        self.ring = HashRing([worker_id])
+        self.urls: Dict[str, str] = {worker_id: worker_url}
+        self.leaving = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.worker_url)
+
+    def owner(self, meeting_id: str) -> str:
+        return self.ring.owner(meeting_id) or self.worker_id
+
+    def is_local(self, meeting_id: str) -> bool:
+        return self.owner(meeting_id) == self.worker_id
+
+    def owner_url(self, meeting_id: str) -> str:
+        return self.urls.get(self.owner(meeting_id), self.worker_url)
+
+    def ws_url(self, meeting_id: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        return f"{self.owner_url(meeting_id)}/ws/meetings/{meeting_id}"
+
+    def leave(self):
+        # Drop this worker from its own ring so every meeting resolves to a peer
+        self.leaving = True
+        self.ring.remove(self.worker_id)
+        self.urls.pop(self.worker_id, None)
+
+    def update(self, members: Dict[str, str]) -> bool:
+        """Replace ring membership; returns True when ownership may have moved."""
+        members = dict(members)
+        if self.leaving:
+            members.pop(self.worker_id, None)
+        else:
+            members.setdefault(self.worker_id, self.worker_url)
+        current = self.ring.nodes
+        changed = False
+        for node in current - members.keys():
+            self.ring.remove(node)
+            changed = True
+        for node in members.keys() - current:
+            self.ring.add(node)
+            changed = True
+        self.urls = members
+        return changed
+
+
+shard_map = ShardMap()
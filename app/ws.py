@@ -1,29 +1,80 @@
 import json
 import asyncio
-from typing import Dict, Set, Optional, DefaultDict
+import bisect
+import random
+from typing import Dict, List, Set, Optional, DefaultDict
  
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
  
-from .core import decode_token
+from .core import decode_token, create_access_token, RESUME_TOKEN_MINUTES
 from .database import get_db
-from .models import Meeting, Participant, User, ChatMessage
+from .models import Meeting, User, ChatMessage
+from .sessions import participant_sessions
+from .analytics import event_log
+from .sharding import shard_map
 
 
 router = APIRouter(prefix="/ws/meetings", tags=["WebSocket"])
 
+# Upper bound for the random delay clients wait before reconnecting on drain
+DRAIN_JITTER_MS = 5000
+# Webinar audiences get presence counts and panelist media state on this cadence
+WEBINAR_TICK_SECONDS = 1.0
+ROSTER_PAGE_MAX = 100
+
+
+def reconnect_hint(meeting_id: str, delay_ms: int = 0, resume: str | None = None) -> str:
+    data = {"url": shard_map.ws_url(meeting_id), "delay_ms": delay_ms}
+    if resume:
+        data["resume"] = resume
+    return json.dumps({"type": "reconnect", "data": data})
+
+
+def create_resume_token(meeting_id: str, user_id: int, name: str) -> str:
+    return create_access_token(
+        {"sub": str(user_id), "name": name, "mid": meeting_id, "typ": "resume"},
+        expires_minutes=RESUME_TOKEN_MINUTES,
+    )
+
+
+def _decode_resume(token: str, meeting_id: str) -> dict | None:
+    payload = decode_token(token)
+    if not payload or payload.get("typ") != "resume" or payload.get("mid") != meeting_id or "sub" not in payload:
+        return None
+    return payload
+
 
 class Connection:
-    def __init__(self, websocket: WebSocket, user_id: int, name: str):
+    def __init__(self, websocket: WebSocket, user_id: int, name: str, role: str = "panelist"):
         self.websocket = websocket
         self.user_id = user_id
         self.name = name
+        # "panelist" (full peer, includes the host) or "audience" (webinar viewers)
+        self.role = role
+        # Set on drain: session rows are closed in bulk, skip per-socket cleanup
+        self.drained = False
  
  
 class RoomState:
     def __init__(self):
         self.presenter_id: Optional[int] = None
         self.media: Dict[int, Dict[str, bool]] = {}
+        self.mode = "meeting"
+        # Webinar tiers: panel connections get every event immediately, the
+        # audience gets batched counts and sampled media state from the ticker
+        self.panel: Set[Connection] = set()
+        # distinct audience users and sorted user ids for roster paging,
+        # maintained by RoomManager.add/remove
+        self.audience_count = 0
+        self.user_ids: List[int] = []
+        self.count_dirty = False
+        self.dirty_media: Set[int] = set()
+        self.ticker: Optional[asyncio.Task] = None
+
+    @property
+    def webinar(self) -> bool:
+        return self.mode == "webinar"
  
  
 class RoomManager:
@@ -32,6 +83,7 @@ class RoomManager:
         self.state: Dict[str, RoomState] = {}
         # meeting_id -> user_id -> set(connections). Supports multiple tabs per user
         self.user_index: Dict[str, Dict[int, Set[Connection]]] = {}
+        self.draining = False
  
     def room_key(self, meeting_id: str) -> str:
         return meeting_id
@@ -50,12 +102,19 @@ class RoomManager:
         # index
         user_map = self.user_index.setdefault(self.room_key(meeting_id), {})
         conns = user_map.setdefault(conn.user_id, set())
+        if not conns:
+            bisect.insort(st.user_ids, conn.user_id)
+            if conn.role == "audience":
+                st.audience_count += 1
         conns.add(conn)
+        if conn.role == "panelist":
+            st.panel.add(conn)
  
     def remove(self, meeting_id: str, conn: Connection):
         room = self.get_room(meeting_id)
         if conn in room:
             room.remove(conn)
+            st = self.state.get(self.room_key(meeting_id))
             # index cleanup
             uidx = self.user_index.get(self.room_key(meeting_id))
             if uidx is not None:
@@ -64,9 +123,19 @@ class RoomManager:
                     s.remove(conn)
                     if not s:
                         uidx.pop(conn.user_id, None)
+                        if st is not None:
+                            i = bisect.bisect_left(st.user_ids, conn.user_id)
+                            if i < len(st.user_ids) and st.user_ids[i] == conn.user_id:
+                                del st.user_ids[i]
+                            if conn.role == "audience":
+                                st.audience_count -= 1
+            if st is not None:
+                st.panel.discard(conn)
         if not room:
             self.rooms.pop(self.room_key(meeting_id), None)
-            self.state.pop(self.room_key(meeting_id), None)
+            st = self.state.pop(self.room_key(meeting_id), None)
+            if st is not None and st.ticker is not None:
+                st.ticker.cancel()
             self.user_index.pop(self.room_key(meeting_id), None)
  
     async def broadcast(self, meeting_id: str, message: dict, exclude: Connection | None = None):
@@ -80,6 +149,67 @@ class RoomManager:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
  
+    async def broadcast_panel(self, meeting_id: str, message: dict, exclude: Connection | None = None):
+        st = self.state.get(self.room_key(meeting_id))
+        if st is None:
+            return
+        data = json.dumps(message)
+        tasks = [self._safe_send(c, data, meeting_id) for c in list(st.panel) if c is not exclude]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def broadcast_audience(self, meeting_id: str, message: dict):
+        st = self.state.get(self.room_key(meeting_id))
+        if st is None:
+            return
+        data = json.dumps(message)
+        tasks = [self._safe_send(c, data, meeting_id) for c in list(self.get_room(meeting_id)) if c not in st.panel]
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_panelist(self, meeting_id: str, user_id: int) -> bool:
+        st = self.state.get(self.room_key(meeting_id))
+        if st is None:
+            return False
+        return any(c.user_id == user_id for c in st.panel)
+
+    def audience_count(self, meeting_id: str) -> int:
+        st = self.state.get(self.room_key(meeting_id))
+        return st.audience_count if st is not None else 0
+
+    def roster_page(self, meeting_id: str, offset: int, limit: int) -> dict:
+        st = self.get_state(meeting_id)
+        users = self.user_index.get(self.room_key(meeting_id), {})
+        page = []
+        for uid in st.user_ids[offset:offset + limit]:
+            conn = next(iter(users[uid]))
+            page.append({"id": uid, "name": conn.name, "role": conn.role})
+        return {"offset": offset, "total": len(st.user_ids), "participants": page}
+
+    def start_webinar(self, meeting_id: str):
+        st = self.get_state(meeting_id)
+        st.mode = "webinar"
+        if st.ticker is None:
+            st.ticker = asyncio.create_task(self._webinar_tick(meeting_id))
+
+    async def _webinar_tick(self, meeting_id: str):
+        # One message per tick instead of one per audience join/leave/media change
+        while self.room_key(meeting_id) in self.rooms:
+            await asyncio.sleep(WEBINAR_TICK_SECONDS)
+            st = self.state.get(self.room_key(meeting_id))
+            if st is None:
+                return
+            if st.count_dirty:
+                st.count_dirty = False
+                await self.broadcast(
+                    meeting_id, {"type": "audience-count", "data": {"count": self.audience_count(meeting_id)}}
+                )
+            if st.dirty_media:
+                changed = [{"id": uid, **st.media[uid]} for uid in st.dirty_media if uid in st.media]
+                st.dirty_media.clear()
+                if changed:
+                    await self.broadcast_audience(meeting_id, {"type": "media-batch", "data": changed})
+
     async def _safe_send(self, conn: Connection, data: str, meeting_id: str):
         try:
             await conn.websocket.send_text(data)
@@ -95,62 +225,113 @@ class RoomManager:
         if tasks:
             await asyncio.gather(*tasks, return_exceptions=True)
  
+    async def handoff(self, meeting_id: str, code: int = 4307):
+        conns = list(self.rooms.get(self.room_key(meeting_id), set()))
+        # Close this worker's sessions and write the leaves *before* the hint,
+        # so they cannot land after the new owner's join and close its row.
+        # Like drain, the socket's finally then skips its own cleanup.
+        for conn in conns:
+            conn.drained = True
+            participant_sessions.close_session(meeting_id, conn.user_id)
+            event_log.record(meeting_id, conn.user_id, "leave")
+        try:
+            await asyncio.to_thread(participant_sessions.flush)
+        except Exception:
+            pass
+        # Tell every client in the room to reconnect to the owning worker, then close
+        data = reconnect_hint(meeting_id)
+        for conn in conns:
+            try:
+                await conn.websocket.send_text(data)
+                await conn.websocket.close(code=code)
+            except Exception:
+                pass
+            self.remove(meeting_id, conn)
+ 
  
 manager = RoomManager()
 
 
 @router.websocket("/{meeting_id}")
 async def websocket_endpoint(websocket: WebSocket, meeting_id: str, token: str = None, db: Session = Depends(get_db)):
-    if token is None:
-        token = websocket.query_params.get("token")
-    if not token:
-        await websocket.close(code=4401)
+    if manager.draining:
+        # Worker is shutting down: point the client elsewhere, jittered like the drain hints
+        await websocket.accept()
+        await websocket.send_text(reconnect_hint(meeting_id, random.randint(0, DRAIN_JITTER_MS)))
+        await websocket.close(code=1012)
         return
-    payload = decode_token(token)
-    if not payload or "sub" not in payload:
-        await websocket.close(code=4401)
-        return
- 
-    user: User | None = db.get(User, int(payload["sub"]))
-    if not user:
-        await websocket.close(code=4403)
+    if not shard_map.is_local(meeting_id):
+        # Room is owned by another worker: hand off before touching the DB
+        await websocket.accept()
+        await websocket.send_text(reconnect_hint(meeting_id))
+        await websocket.close(code=4307)
         return
- 
+
+    resume = websocket.query_params.get("resume")
+    resumed = _decode_resume(resume, meeting_id) if resume else None
+    if resumed is not None:
+        # Reconnect after a drain: the signed resume token already carries the
+        # identity, so skip the User lookup
+        user = User(id=int(resumed["sub"]), name=resumed.get("name") or "User")
+    else:
+        if token is None:
+            token = websocket.query_params.get("token")
+        if not token:
+            await websocket.close(code=4401)
+            return
+        payload = decode_token(token)
+        if not payload or "sub" not in payload or payload.get("typ") == "resume":
+            await websocket.close(code=4401)
+            return
+
+        user: User | None = db.get(User, int(payload["sub"]))
+        if not user:
+            await websocket.close(code=4403)
+            return
+
+    # Always checked, resumed or not: the host may have ended the meeting
+    # while the client was waiting to reconnect
     meeting: Meeting | None = db.query(Meeting).filter(Meeting.meeting_id == meeting_id).first()
     if not meeting or meeting.ended_at is not None:
         await websocket.close(code=4404)
         return
+    mode = meeting.mode or "meeting"
+    role = "panelist"
+    if mode == "webinar" and user.id != meeting.host_id and user.id not in (meeting.panelist_ids or []):
+        role = "audience"
  
     await websocket.accept()
-    conn = Connection(websocket, user.id, user.name)
+    conn = Connection(websocket, user.id, user.name, role)
     manager.add(meeting_id, conn)
+    event_log.record(meeting_id, user.id, "join")
+    if mode == "webinar":
+        manager.start_webinar(meeting_id)
  
-    # Ensure participant exists (idempotent)
-    p = (
-        db.query(Participant)
-        .filter(Participant.meeting_id == meeting.meeting_id, Participant.user_id == user.id, Participant.left_at.is_(None))
-        .first()
-    )
-    if not p:
-        db.add(Participant(meeting_id=meeting.meeting_id, user_id=user.id))
-        db.commit()
+    # Ensure participant exists (idempotent upsert, written in the next batch)
+    participant_sessions.open_session(meeting_id, user.id, user.name)
  
-    # Send snapshot to new connection
+    # Send snapshot to new connection. Webinar snapshots only list the panel;
+    # the audience is summarised by a count and paged via "roster" requests.
     st = manager.get_state(meeting_id)
+    peers = st.panel if st.webinar else manager.get_room(meeting_id)
     snapshot = [
         {"id": c.user_id, "name": c.name, **st.media.get(c.user_id, {"mic": True, "cam": True})}
-        for c in manager.get_room(meeting_id)
+        for c in peers
     ]
-    await websocket.send_text(
-        json.dumps({
-            "type": "room-state",
-            "participants": snapshot,
-            "presenter_id": st.presenter_id,
-        })
-    )
+    room_state = {
+        "type": "room-state",
+        "participants": snapshot,
+        "presenter_id": st.presenter_id,
+    }
+    if st.webinar:
+        room_state.update({"mode": "webinar", "role": role, "audience_count": manager.audience_count(meeting_id)})
+    await websocket.send_text(json.dumps(room_state))
  
     # Notify others
-    await manager.broadcast(meeting_id, {"type": "user-joined", "user": {"id": user.id, "name": user.name}}, exclude=conn)
+    if role == "audience":
+        st.count_dirty = True
+    else:
+        await manager.broadcast(meeting_id, {"type": "user-joined", "user": {"id": user.id, "name": user.name}}, exclude=conn)
  
     try:
         while True:
@@ -169,11 +350,17 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str, token: str =
  
             # Screen share + media state updates
             if mtype == "screen-share-start":
+                if conn.role == "audience":
+                    continue
                 st.presenter_id = user.id
+                event_log.record(meeting_id, user.id, mtype)
                 await manager.broadcast(meeting_id, payload, exclude=conn)
             elif mtype == "screen-share-stop":
+                if conn.role == "audience":
+                    continue
                 if st.presenter_id == user.id:
                     st.presenter_id = None
+                event_log.record(meeting_id, user.id, mtype)
                 await manager.broadcast(meeting_id, payload, exclude=conn)
             elif mtype in {"mute", "unmute", "camera-on", "camera-off"}:
                 media = manager.get_state(meeting_id).media.setdefault(user.id, {"mic": True, "cam": True})
@@ -181,11 +368,14 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str, token: str =
                     media["mic"] = (mtype == "unmute")
                 else:
                     media["cam"] = (mtype == "camera-on")
-                await manager.broadcast(
-                    meeting_id,
-                    {"type": "media", "sender": {"id": user.id, "name": user.name}, "data": media},
-                    exclude=conn,
-                )
+                event_log.record(meeting_id, user.id, mtype)
+                media_msg = {"type": "media", "sender": {"id": user.id, "name": user.name}, "data": media}
+                if not st.webinar:
+                    await manager.broadcast(meeting_id, media_msg, exclude=conn)
+                elif conn.role == "panelist":
+                    # Panel sees it now; the audience gets it in the next media-batch
+                    await manager.broadcast_panel(meeting_id, media_msg, exclude=conn)
+                    st.dirty_media.add(user.id)
             # Signaling relay (targeted when 'to' present)
             elif mtype in {"offer", "answer", "ice-candidate"}:
                 target = None
@@ -193,26 +383,44 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str, token: str =
                     target = int((msg.get("data") or {}).get("to"))
                 except Exception:
                     target = None
-                if target:
+                if st.webinar:
+                    # Audience may only signal a panelist; untargeted offers stay on the panel
+                    if target and (conn.role == "panelist" or manager.is_panelist(meeting_id, target)):
+                        await manager.send_to_user(meeting_id, target, payload)
+                    elif not target and conn.role == "panelist":
+                        await manager.broadcast_panel(meeting_id, payload, exclude=conn)
+                elif target:
                     await manager.send_to_user(meeting_id, target, payload)
                 else:
                     await manager.broadcast(meeting_id, payload, exclude=conn)
+            elif mtype == "roster":
+                data = msg.get("data") or {}
+                try:
+                    offset = max(int(data.get("offset", 0)), 0)
+                    limit = min(max(int(data.get("limit", ROSTER_PAGE_MAX)), 1), ROSTER_PAGE_MAX)
+                except Exception:
+                    continue
+                await websocket.send_text(
+                    json.dumps({"type": "roster", "data": manager.roster_page(meeting_id, offset, limit)})
+                )
             elif mtype == "chat":
                 text = (msg.get("data") or {}).get("text")
                 if isinstance(text, str) and text.strip():
                     # persist
-                    cm = ChatMessage(meeting_id=meeting.meeting_id, user_id=user.id, message=text.strip())
+                    cm = ChatMessage(meeting_id=meeting_id, user_id=user.id, message=text.strip())
                     db.add(cm)
                     db.commit()
-                    await manager.broadcast(
-                        meeting_id,
-                        {
-                            "type": "chat",
-                            "sender": {"id": user.id, "name": user.name},
-                            "data": {"id": cm.id, "text": text, "timestamp": cm.timestamp.isoformat()},
-                        },
-                        exclude=conn,
-                    )
+                    event_log.record(meeting_id, user.id, "chat", len(cm.message))
+                    chat_msg = {
+                        "type": "chat",
+                        "sender": {"id": user.id, "name": user.name},
+                        "data": {"id": cm.id, "text": text, "timestamp": cm.timestamp.isoformat()},
+                    }
+                    if conn.role == "audience":
+                        # Audience chat goes to the panel only (Q&A style)
+                        await manager.broadcast_panel(meeting_id, chat_msg, exclude=conn)
+                    else:
+                        await manager.broadcast(meeting_id, chat_msg, exclude=conn)
             else:
                 # ignore unknown
                 pass
@@ -221,13 +429,14 @@ async def websocket_endpoint(websocket: WebSocket, meeting_id: str, token: str =
         pass
     finally:
         manager.remove(meeting_id, conn)
-        # mark left
-        from sqlalchemy import func
-        db.query(Participant).filter(
-            Participant.meeting_id == meeting_id, Participant.user_id == user.id, Participant.left_at.is_(None)
-        ).update({Participant.left_at: func.now()})
-        db.commit()
-        await manager.broadcast(meeting_id, {"type": "user-left", "user": {"id": user.id, "name": user.name}})
+        if not conn.drained:
+            # mark left once the user's last tab is gone
+            participant_sessions.close_session(meeting_id, user.id)
+            event_log.record(meeting_id, user.id, "leave")
+            if conn.role == "audience":
+                st.count_dirty = True
+            else:
+                await manager.broadcast(meeting_id, {"type": "user-left", "user": {"id": user.id, "name": user.name}})
         # Do not auto-end meeting when host disconnects (e.g., on refresh).
         # Meetings should end explicitly via the /meeting/end endpoint.
  
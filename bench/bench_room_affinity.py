@@ -0,0 +1,122 @@
+"""Compare room fan-out latency with random vs. affinity placement.
+
+Spawns one process per simulated worker. A broadcast is delivered to the
+sender worker's local members and relayed over a queue to every other worker
+holding members of the same room, mirroring what a cross-process broker does.
+Affinity placement puts a whole room on its consistent-hash owner, so no relay
+is needed.
+
+    python -m bench.bench_room_affinity --workers 4 --rooms 200 --members 8
+"""
+import argparse
+import json
+import multiprocessing as mp
+import random
+import statistics
+import time
+from typing import Dict, List
+
+from app.sharding import HashRing
+
+
+def _worker(worker_id: str, placement: Dict[str, Dict[str, int]], inbox, peers, done):
+    sink: List[str] = []
+    while True:
+        item = inbox.get()
+        if item is None:
+            return
+        kind, room, msg_id, t0, data = item
+        if kind == "send":
+            data = json.dumps(data)
+            for other in placement[room]:
+                if other != worker_id:
+                    peers[other].put(("relay", room, msg_id, t0, data))
+        for _ in range(placement[room].get(worker_id, 0)):
+            sink.append(data)
+        sink.clear()
+        done.put((msg_id, time.perf_counter()))
+
+
+def _placement(mode: str, workers: List[str], rooms: int, members: int, seed: int) -> Dict[str, Dict[str, int]]:
+    rng = random.Random(seed)
+    ring = HashRing(workers)
+    result: Dict[str, Dict[str, int]] = {}
+    for r in range(rooms):
+        room = f"room-{r:05d}"
+        counts: Dict[str, int] = {}
+        for _ in range(members):
+            w = ring.owner(room) if mode == "affinity" else rng.choice(workers)
+            counts[w] = counts.get(w, 0) + 1
+        result[room] = counts
+    return result
+
+
+def run(mode: str, workers: int, rooms: int, members: int, messages: int, seed: int) -> Dict[str, float]:
+    names = [f"w{i}" for i in range(workers)]
+    placement = _placement(mode, names, rooms, members, seed)
+    inboxes = {n: mp.Queue() for n in names}
+    done = mp.Queue()
+    procs = [mp.Process(target=_worker, args=(n, placement, inboxes[n], inboxes, done)) for n in names]
+    for p in procs:
+        p.start()
+
+    rng = random.Random(seed + 1)
+    room_ids = list(placement.keys())
+    payload = {"type": "media", "sender": {"id": 1, "name": "bench"}, "data": {"mic": False, "cam": True}}
+    latencies: List[float] = []
+    hops: List[int] = []
+    try:
+        for msg_id in range(messages):
+            room = rng.choice(room_ids)
+            holders = placement[room]
+            origin = rng.choice([w for w, n in holders.items() for _ in range(n)])
+            t0 = time.perf_counter()
+            inboxes[origin].put(("send", room, msg_id, t0, payload))
+            t_end = t0
+            for _ in range(len(holders)):
+                _, t = done.get()
+                t_end = max(t_end, t)
+            latencies.append((t_end - t0) * 1e6)
+            hops.append(len(holders) - 1)
+    finally:
+        for n in names:
+            inboxes[n].put(None)
+        for p in procs:
+            p.join()
+
+    latencies.sort()
+    return {
+        "p50_us": statistics.median(latencies),
+        "p95_us": latencies[int(len(latencies) * 0.95) - 1],
+        "p99_us": latencies[int(len(latencies) * 0.99) - 1],
+        "mean_relays": statistics.mean(hops),
+    }
+
+
+def moved_fraction(workers: int, rooms: int) -> float:
+    before = HashRing([f"w{i}" for i in range(workers)])
+    after = HashRing([f"w{i}" for i in range(workers + 1)])
+    keys = [f"room-{r:05d}" for r in range(rooms)]
+    return sum(before.owner(k) != after.owner(k) for k in keys) / len(keys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--members", type=int, default=8)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    for mode in ("random", "affinity"):
+        r = run(mode, args.workers, args.rooms, args.members, args.messages, args.seed)
+        print(
+            f"{mode:>8}: p50={r['p50_us']:.0f}us p95={r['p95_us']:.0f}us "
+            f"p99={r['p99_us']:.0f}us relays/msg={r['mean_relays']:.2f}"
+        )
+    print(f"rooms moved when adding worker #{args.workers + 1}: {moved_fraction(args.workers, 10000):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Measure time-to-first-accepted-WebSocket for freshly started workers.
+
+Needs a reachable MySQL (BAAPMEET_DATABASE_URL) already migrated with
+`python -m app.migrations upgrade`. A setup worker creates a user and a
+meeting, then N workers are started at once, as in a rolling restart. For
+each worker we time process spawn -> first `room-state` frame on
+/ws/meetings/{id}.
+
+    python -m bench.bench_startup --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+import uuid
+from typing import List
+
+import websockets
+
+
+def _spawn(port: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=dict(os.environ),
+    )
+
+
+def _post(base: str, path: str, body: dict, token: str | None = None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    req = urllib.request.Request(base + path, data=json.dumps(body).encode(), headers=headers, method="POST")
+    with urllib.request.urlopen(req, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def _wait_http(base: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base + "/health/", timeout=1)
+            return
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError(f"{base} did not come up")
+
+
+def setup(port: int) -> tuple[str, str]:
+    base = f"http://127.0.0.1:{port}"
+    proc = _spawn(port)
+    try:
+        _wait_http(base, 30)
+        email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+        token = _post(base, "/auth/signup", {"name": "bench", "email": email, "password": "benchpass"})["token"]
+        meeting_id = _post(base, "/meeting/create", {}, token)["meeting_id"]
+        return token, meeting_id
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+async def _first_ws(port: int, meeting_id: str, token: str, t0: float, timeout: float) -> float:
+    url = f"ws://127.0.0.1:{port}/ws/meetings/{meeting_id}?token={token}"
+    deadline = t0 + timeout
+    while time.perf_counter() < deadline:
+        try:
+            async with websockets.connect(url, open_timeout=1) as ws:
+                msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=2))
+                if msg.get("type") == "room-state":
+                    return time.perf_counter() - t0
+        except Exception:
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f"worker on :{port} never accepted a WebSocket")
+
+
+async def measure(ports: List[int], meeting_id: str, token: str, timeout: float) -> List[float]:
+    t0 = time.perf_counter()
+    procs = [_spawn(p) for p in ports]
+    try:
+        return await asyncio.gather(*(_first_ws(p, meeting_id, token, t0, timeout) for p in ports))
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    token, meeting_id = setup(args.base_port)
+    ports = [args.base_port + 1 + i for i in range(args.workers)]
+    results = asyncio.run(measure(ports, meeting_id, token, args.timeout))
+    for port, seconds in zip(ports, results):
+        print(f"worker :{port} first WS accepted after {seconds * 1000:.0f}ms")
+    print(f"max {max(results) * 1000:.0f}ms, mean {sum(results) / len(results) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()